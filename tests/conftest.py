@@ -0,0 +1,187 @@
+# Shared helpers for the importer tests
+#
+# The parser tests only need Python. The import tests need Blender's Python and are skipped without bpy,
+# run them with the bpy module installed
+# or with: blender --background --factory-startup --python-expr "import sys, pytest; sys.exit(pytest.main(['tests']))"
+#
+# Golden snapshots are stored in tests/golden as <corpus name>.json with one section per kind of snapshot.
+# A missing snapshot fails the test, set XPLANE_UPDATE_GOLDEN=1 to record them after an intended change.
+
+import json
+import os
+import sys
+
+import pytest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+CORPUS_DIR = os.path.join(TESTS_DIR, 'corpus')
+GOLDEN_DIR = os.path.join(TESTS_DIR, 'golden')
+
+# import xplane11import.py as a plain module
+sys.path.insert(0, os.path.dirname(TESTS_DIR))
+
+CORPUS = sorted(os.path.splitext(name)[0] for name in os.listdir(CORPUS_DIR) if name.endswith('.obj'))
+
+
+def corpusPath(name):
+    return os.path.join(CORPUS_DIR, name + '.obj')
+
+
+def readGolden(name):
+    path = os.path.join(GOLDEN_DIR, name + '.json')
+    if(not os.path.exists(path)):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def writeGolden(name, section, data):
+    # only when asked to, a normal test run never writes into the source tree
+    golden = readGolden(name)
+    golden[section] = data
+    with open(os.path.join(GOLDEN_DIR, name + '.json'), 'w') as f:
+        json.dump(golden, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def checkGolden(name, section, data):
+    # compare the data with the golden snapshot
+    # compare the JSON form so tuples and lists match
+    data = json.loads(json.dumps(data))
+    if(os.environ.get('XPLANE_UPDATE_GOLDEN')):
+        writeGolden(name, section, data)
+    golden = readGolden(name)
+    if(section not in golden):
+        pytest.fail('there is no %s snapshot for %s, record it with XPLANE_UPDATE_GOLDEN=1' % (section, name))
+
+    assert data == golden[section]
+
+
+def rounded(value):
+    # floats rounded and without negative zero, tuples as lists, so the snapshots are stable JSON
+    if(isinstance(value, float)):
+        return round(value, 6) + 0.0
+    if(isinstance(value, (list, tuple))):
+        return [rounded(item) for item in value]
+    if(isinstance(value, dict)):
+        return {key: rounded(item) for key, item in value.items()}
+    return value
+
+
+def parseSnapshot(data, objDir):
+    # the parsed objects, hierarchy, materials and keyframes the importer builds from
+    def texture(path):
+        return os.path.relpath(path, objDir).replace(os.sep, '/') if path else None
+
+    def mesh(obj):
+        texturePath, normal, lit, state = obj['mat']
+        return {
+            'label': obj['label'], 'tris': obj['tris'], 'lod': obj['lod'], 'orig': obj['orig'], 'offset': obj['offset'],
+            'material': {'texture': texture(texturePath), 'normal': texture(normal), 'lit': texture(lit), 'state': dict(state)},
+            'attr': obj['attr'], 'state': obj['state'], 'kf': obj['kf']
+        }
+
+    return rounded({
+        'errors': data['errors'],
+        'warnings': data['warnings'],
+        'directives': data['stats'],
+        'verts': data['pool'].numVerts,
+        'indices': data['pool'].numIdx,
+        'objects': [mesh(obj) for obj in data['objects']],
+        'armatures': [{'label': arm['label'], 'parent': arm['parent'], 'rotOrig': arm['rotOrig'], 'kf': arm['kf'],
+            'meshes': [mesh(obj) for obj in arm['meshes']]} for arm in data['armatures']]
+    })
+
+
+def writeLargeObj(path, numObjects, quadsPerObject):
+    # a grid of quads split into objects, every 10th object is animated and every 50th has a nested block
+    # returns the number of vertices
+    lines = ['I', '800', 'OBJ', '']
+    numVerts = numObjects * quadsPerObject * 4
+    numIdx = numObjects * quadsPerObject * 6
+    lines.append('POINT_COUNTS %d 0 0 %d' % (numVerts, numIdx))
+    for quad in range(numObjects * quadsPerObject):
+        x = float(quad % 100)
+        z = float(quad // 100)
+        for dx, dz in ((0, 0), (1, 0), (1, 1), (0, 1)):
+            lines.append('VT %g 0 %g 0 1 0 %g %g' % (x + dx, z + dz, dx, dz))
+
+    indices = []
+    for quad in range(numObjects * quadsPerObject):
+        first = quad * 4
+        indices.extend((first, first + 1, first + 2, first, first + 2, first + 3))
+    fullRows = len(indices) - len(indices) % 10
+    for start in range(0, fullRows, 10):
+        lines.append('IDX10 ' + ' '.join(str(index) for index in indices[start:start + 10]))
+    for index in indices[fullRows:]:
+        lines.append('IDX %d' % index)
+
+    trisCount = quadsPerObject * 6
+    for obj in range(numObjects):
+        tris = 'TRIS %d %d' % (obj * trisCount, trisCount)
+        lines.append('# part%d' % obj)
+        if(obj % 50 == 0):
+            lines += ['ANIM_begin', 'ANIM_trans 0 0 0 0 0.1 0 0 1 sim/test/outer%d' % obj, tris,
+                'ANIM_begin', 'ANIM_rotate 0 1 0 0 90 0 1 sim/test/inner%d' % obj, tris, 'ANIM_end', 'ANIM_end']
+        elif(obj % 10 == 0):
+            lines += ['ANIM_begin', 'ANIM_rotate 1 0 0 0 45 0 1 sim/test/rot%d' % obj, tris, 'ANIM_end']
+        else:
+            lines.append(tris)
+
+    with open(path, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+    return numVerts
+
+
+@pytest.fixture(scope='session')
+def importer():
+    pytest.importorskip('bpy')
+    import xplane11import
+    if(not xplane11import.xplane11import.is_registered):
+        xplane11import.register()
+    return xplane11import
+
+
+@pytest.fixture
+def importObj(importer):
+    # import a file into an empty scene and return its collection
+    import bpy
+
+    def importFile(path, **options):
+        bpy.ops.wm.read_homefile(use_empty=True)
+        result = bpy.ops.object.xplane11import(filepath=path, **options)
+        assert 'FINISHED' in result
+        return bpy.data.collections[os.path.splitext(os.path.basename(path))[0]]
+
+    return importFile
+
+
+def actionFcurves(action):
+    # Blender 5.0 keeps the fcurves in the channel bags of the action layers
+    if(hasattr(action, 'fcurves')):
+        return list(action.fcurves)
+    return [fcurve for layer in action.layers for strip in layer.strips
+        for channelbag in strip.channelbags for fcurve in channelbag.fcurves]
+
+
+def sceneSnapshot(collection):
+    # the objects, hierarchy, mesh sizes, materials and keyframe frames of an imported collection
+    # the locations and keyframe values come from the parsed data, the parse snapshot covers those
+    objects = {}
+    for ob in collection.objects:
+        entry = {
+            'type': ob.type,
+            'parent': ob.parent.name if ob.parent else None
+        }
+        if(ob.type == 'MESH'):
+            entry['verts'] = len(ob.data.vertices)
+            entry['faces'] = len(ob.data.polygons)
+            entry['materials'] = [mat.name for mat in ob.data.materials if mat]
+        keyframes = {}
+        if(ob.animation_data and ob.animation_data.action):
+            for fcurve in actionFcurves(ob.animation_data.action):
+                path = '%s[%d]' % (fcurve.data_path, fcurve.array_index)
+                keyframes[path] = [round(point.co[0]) for point in fcurve.keyframe_points]
+        entry['keyframes'] = keyframes
+        objects[ob.name] = entry
+    return {'count': len(objects), 'objects': objects}
@@ -0,0 +1,167 @@
+import os
+
+import pytest
+
+from conftest import CORPUS, checkGolden, corpusPath, sceneSnapshot
+
+bpy = pytest.importorskip('bpy')
+
+# the material names of the texture test carry a hash of the absolute texture paths, they are not stable
+SNAPSHOT_CORPUS = [name for name in CORPUS if name != 'textures']
+# the image names in the corpus differ in case from the obj to check the texture lookup
+TEXTURED = corpusPath('textures')
+
+
+def meshTotals(snapshot):
+    meshes = [entry for entry in snapshot['objects'].values() if entry['type'] == 'MESH']
+    return sum(entry['verts'] for entry in meshes), sum(entry['faces'] for entry in meshes)
+
+
+@pytest.mark.parametrize('name', SNAPSHOT_CORPUS)
+def test_scene_snapshot(importObj, name):
+    collection = importObj(corpusPath(name))
+    checkGolden(name, 'scene', sceneSnapshot(collection))
+
+
+@pytest.mark.parametrize('name', SNAPSHOT_CORPUS)
+def test_stream_build_matches(importObj, name):
+    expected = sceneSnapshot(importObj(corpusPath(name)))
+    assert sceneSnapshot(importObj(corpusPath(name), stream_build=True)) == expected
+
+
+def test_nested_armatures(importObj):
+    snapshot = sceneSnapshot(importObj(corpusPath('nested_anim')))
+    objects = snapshot['objects']
+    assert objects['ARM1']['parent'] == 'ARM0'
+    assert objects['ARM0']['parent'] is None
+    assert sorted(entry['parent'] or '' for entry in objects.values() if entry['type'] == 'MESH') == ['', 'ARM0', 'ARM1']
+
+
+def test_meshes_only_keep_their_vertices(importObj):
+    snapshot = sceneSnapshot(importObj(corpusPath('static')))
+    assert [(entry['verts'], entry['faces']) for name, entry in sorted(snapshot['objects'].items())] == [(4, 2), (4, 2), (4, 2)]
+
+
+def test_merge_static(importObj):
+    separate = sceneSnapshot(importObj(corpusPath('static')))
+    collection = importObj(corpusPath('static'), merge_static=True)
+    merged = sceneSnapshot(collection)
+    # floor and roof share a state, the shiny side gets its own mesh
+    assert merged['count'] == 2
+    assert meshTotals(merged) == meshTotals(separate)
+    parts = sorted(ob['xplane_parts'] for ob in collection.objects)
+    assert parts == ['floor roof', 'side']
+
+
+def test_merge_static_keeps_animation(importObj):
+    separate = sceneSnapshot(importObj(corpusPath('nested_anim')))
+    merged = sceneSnapshot(importObj(corpusPath('nested_anim'), merge_static=True))
+    # only the one loose mesh is static, so nothing is merged away
+    assert merged['count'] == separate['count']
+    assert meshTotals(merged) == meshTotals(separate)
+
+
+def test_lod_selection(importObj):
+    assert sceneSnapshot(importObj(corpusPath('lods')))['count'] == 6
+    assert sceneSnapshot(importObj(corpusPath('lods'), lod=0))['count'] == 3
+    assert sceneSnapshot(importObj(corpusPath('lods'), lod=1))['count'] == 3
+
+
+def test_import_stats_count_built_verts(importer, importObj):
+    # only the selected level is built, the stats must not count the skipped vertices
+    for options in ({}, {'lod': 1}, {'merge_static': True}):
+        snapshot = sceneSnapshot(importObj(corpusPath('lods'), **options))
+        assert importer.importStats['verts'] == meshTotals(snapshot)[0]
+
+
+def test_merge_static_keeps_lods_apart(importObj):
+    collection = importObj(corpusPath('lods'), merge_static=True)
+    # ATTR_LOD is not part of the state, the three meshes of each level merge
+    parts = sorted(ob['xplane_parts'] for ob in collection.objects)
+    assert parts == ['OBJ0 OBJ1 OBJ2', 'OBJ3 OBJ4 OBJ5']
+
+
+def test_merge_static_uses_the_attributes_in_effect(importObj):
+    collection = importObj(TEXTURED, merge_static=True)
+    # plain_again is drawn with the same state as plain after ATTR_reset and ATTR_blend
+    parts = sorted(ob['xplane_parts'] for ob in collection.objects)
+    assert parts == ['cutout', 'plain plain_again', 'shiny']
+
+
+def test_materials_per_state(importObj):
+    collection = importObj(TEXTURED)
+    materials = {ob.name: ob.data.materials[0].name for ob in collection.objects}
+    # plain and plain_again have the same textures and attributes
+    assert materials['plain'] == materials['plain_again']
+    assert len(set(materials.values())) == 3
+    for name in set(materials.values()):
+        assert bpy.data.materials[name].node_tree.nodes.get('Image Texture').image
+    cutout = bpy.data.materials[materials['cutout']]
+    if(hasattr(cutout, 'surface_render_method')):
+        alpha = cutout.node_tree.nodes['Principled BSDF'].inputs['Alpha'].links[0].from_node
+        assert alpha.name == 'Alpha Clip'
+        assert alpha.inputs[1].default_value == pytest.approx(0.5)
+    else:
+        assert cutout.blend_method == 'CLIP'
+
+
+def test_materials_reused_across_imports(importObj):
+    importObj(TEXTURED)
+    numMaterials = len(bpy.data.materials)
+    bpy.ops.object.xplane11import(filepath=TEXTURED)
+    assert len(bpy.data.materials) == numMaterials
+
+
+def test_skip_textures(importObj):
+    collection = importObj(TEXTURED, skip_textures=True)
+    materials = {ob.name: [mat.name for mat in ob.data.materials] for ob in collection.objects}
+    # only the attribute state is left
+    assert materials['plain'] == []
+    assert len(materials['shiny']) == 1
+    assert not bpy.data.images
+
+
+def test_invalid_file_is_cancelled(importer, tmp_path):
+    path = os.path.join(str(tmp_path), 'broken.obj')
+    with open(path, 'w') as f:
+        f.write('I\n800\nOBJ\n\nVT 0 0 0 0 1 0 0 0\nIDX 0\nIDX 0\nIDX 0\nTRIS 0 6\n')
+    bpy.ops.wm.read_homefile(use_empty=True)
+    # the error report of a cancelled operator is raised when it is called from Python
+    with pytest.raises(RuntimeError, match='outside the 3 indices'):
+        bpy.ops.object.xplane11import(filepath=path)
+    assert not bpy.data.objects
+
+
+@pytest.mark.parametrize('stream', [False, True])
+def test_warnings_do_not_cancel(importObj, tmp_path, stream):
+    # POINT_COUNTS declares more than the file has, the geometry is still complete
+    path = os.path.join(str(tmp_path), 'counts.obj')
+    with open(path, 'w') as f:
+        f.write('I\n800\nOBJ\n\nPOINT_COUNTS 4 0 0 3\nVT 0 0 0 0 1 0 0 0\nVT 1 0 0 0 1 0 1 0\nVT 1 0 1 0 1 0 1 1\n'
+            'IDX 0\nIDX 1\nIDX 2\nTRIS 0 3\n')
+    collection = importObj(path, stream_build=stream)
+    assert len(collection.objects) == 1
+
+
+def test_main_converts_each_file(importer, tmp_path):
+    broken = os.path.join(str(tmp_path), 'broken.obj')
+    with open(broken, 'w') as f:
+        f.write('I\n800\nOBJ\n\nVT 0 0 0 0 1 0 0 0\nIDX 0\nIDX 0\nIDX 0\nTRIS 0 6\n')
+    outDir = str(tmp_path)
+    assert importer.main([corpusPath('static'), corpusPath('lods'), '--output-dir', outDir]) == 0
+    assert sorted(name for name in os.listdir(outDir) if name.endswith('.blend')) == ['lods.blend', 'static.blend']
+    bpy.ops.wm.open_mainfile(filepath=os.path.join(outDir, 'static.blend'))
+    assert sorted(collection.name for collection in bpy.data.collections) == ['static']
+    # a file that fails is reported in the exit code, the others are still converted
+    os.remove(os.path.join(outDir, 'static.blend'))
+    assert importer.main([broken, corpusPath('static'), '--output-dir', outDir]) == 1
+    assert os.path.exists(os.path.join(outDir, 'static.blend'))
+    assert not os.path.exists(os.path.join(outDir, 'broken.blend'))
+
+
+def test_main_combine(importer, tmp_path):
+    combined = os.path.join(str(tmp_path), 'all.blend')
+    assert importer.main([corpusPath('static'), corpusPath('lods'), '--combine', combined]) == 0
+    assert sorted(name for name in os.listdir(str(tmp_path))) == ['all.blend']
+    bpy.ops.wm.open_mainfile(filepath=combined)
+    assert sorted(collection.name for collection in bpy.data.collections) == ['lods', 'static']
@@ -0,0 +1,138 @@
+import os
+
+import pytest
+
+from conftest import CORPUS, CORPUS_DIR, checkGolden, corpusPath, parseSnapshot
+
+import xplane11parser
+
+HEADER = 'I\n800\nOBJ\n\n'
+VERTS = 'VT 0 0 0 0 1 0 0 0\nVT 1 0 0 0 1 0 1 0\nVT 1 0 1 0 1 0 1 1\n'
+
+
+def writeObj(tmp_path, body):
+    path = os.path.join(str(tmp_path), 'test.obj')
+    with open(path, 'w') as f:
+        f.write(HEADER + VERTS + body)
+    return path
+
+
+@pytest.mark.parametrize('name', CORPUS)
+def test_corpus_parse_snapshot(name):
+    data = xplane11parser.parseObj(corpusPath(name))
+    checkGolden(name, 'parse', parseSnapshot(data, CORPUS_DIR))
+    # the check without the geometry finds the same
+    assert xplane11parser.validateObj(corpusPath(name)) == (data['errors'], data['warnings'], data['stats'])
+
+
+@pytest.mark.parametrize('body, message', [
+    ('IDX 0\nIDX 1\nIDX 3\nTRIS 0 3\n', 'vertex index 3 is outside the 3 vertices'),
+    ('IDX 0\nIDX 1\nIDX 2\nTRIS 0 6\n', 'TRIS 0 6 is outside the 3 indices'),
+    ('IDX 0\nIDX 1\nIDX 2\nTRIS 0 2\n', 'TRIS count 2 is not a multiple of 3'),
+    ('IDX 0\nIDX 1\nIDX 2\nANIM_begin\nTRIS 0 3\n', '1 ANIM_begin without ANIM_end'),
+    ('IDX 0\nIDX 1\nIDX 2\nTRIS 0 3\nANIM_end\n', 'ANIM_end without ANIM_begin'),
+    ('IDX 0\nIDX 1\nIDX 2\nANIM_begin\nANIM_rotate_key 0 0\nTRIS 0 3\nANIM_end\n',
+        'ANIM_rotate_key without ANIM_rotate_begin'),
+    ('IDX 0\nIDX 1\nIDX 2\nANIM_begin\nANIM_trans_key 0 0 0 0\nTRIS 0 3\nANIM_end\n',
+        'ANIM_trans_key without ANIM_trans_begin'),
+    ('IDX 0\nIDX 1\nIDX 2\nTRIS 0 3\nVT 0 0 0 0 1 0 0 0\n', 'VT after the first TRIS'),
+    ('IDX 0\nIDX 1\nIDX 2\nTRIS 0 x\n', 'bad number in TRIS'),
+    ('IDX 0\nIDX 1\nIDX 2\nTRIS 0\n', 'TRIS expects 2 values'),
+    ('IDX 0\nIDX 1\nIDX 2\nANIM_begin\nANIM_rotate 1 0 0 0 90 0 1\nTRIS 0 3\nANIM_end\n', 'ANIM_rotate expects 8 values'),
+    ('IDX 0\nIDX 1\nIDX 2\nANIM_begin\nANIM_trans 0 0 0 0 1 0 0\nTRIS 0 3\nANIM_end\n', 'ANIM_trans expects 6 or 9 values'),
+    ('IDX 0\nIDX 1\nIDX 2\nANIM_begin\nANIM_trans 0 0 0 0 1 0 x 1 sim/test\nTRIS 0 3\nANIM_end\n', 'bad number in ANIM_trans'),
+])
+def test_structural_errors(tmp_path, body, message):
+    errors, warnings, stats = xplane11parser.validateObj(writeObj(tmp_path, body))
+    assert any(message in error for error in errors), errors
+
+
+def test_point_counts_mismatch_is_a_warning(tmp_path):
+    path = writeObj(tmp_path, 'POINT_COUNTS 4 0 0 3\nIDX 0\nIDX 1\nIDX 2\nTRIS 0 3\n')
+    errors, warnings, stats = xplane11parser.validateObj(path)
+    assert errors == []
+    assert warnings == ['line 8: POINT_COUNTS declares 4 vertices and 3 indices, found 3 and 3']
+    assert xplane11parser.main([path]) == 0
+
+
+def test_header_is_not_counted(tmp_path):
+    errors, warnings, stats = xplane11parser.validateObj(writeObj(tmp_path, 'IDX 0\nIDX 1\nIDX 2\nTRIS 0 3\n'))
+    assert stats == {'VT': 3, 'IDX': 3, 'TRIS': 1}
+
+
+def test_main_check_exit_code(tmp_path):
+    good = corpusPath('static')
+    bad = writeObj(tmp_path, 'IDX 0\nIDX 1\nIDX 2\nTRIS 0 6\n')
+    assert xplane11parser.main([good]) == 0
+    assert xplane11parser.main([good, bad]) == 1
+
+
+def test_import_uses_the_checked_data(tmp_path):
+    # the importer builds from the same parse that found no errors
+    data = xplane11parser.parseObj(writeObj(tmp_path, 'IDX 0\nIDX 1\nIDX 2\nANIM_begin\n'
+        'ANIM_trans 0 0 0 0 1 0 0 1 sim/test/door\nANIM_hide 0 0.5 sim/test/door\nTRIS 0 3\nANIM_end\n'))
+    assert data['errors'] == []
+    assert data['pool'].numVerts == 3
+    obj, = data['objects']
+    assert obj['tris'] == (0, 3)
+    assert [kf[0] for kf in obj['kf']] == ['loc', 'loc', 'hide']
+
+
+def test_meshes_keep_their_lod():
+    data = xplane11parser.parseObj(corpusPath('lods'))
+    assert [mesh['lod'] for mesh in data['objects']] == [0, 0, 0, 1, 1, 1]
+    assert [mesh['label'] for mesh in xplane11parser.parseObj(corpusPath('lods'), lod=1)['objects']] == ['OBJ0', 'OBJ1', 'OBJ2']
+
+
+def test_render_state_per_mesh(tmp_path):
+    data = xplane11parser.parseObj(writeObj(tmp_path, 'IDX 0\nIDX 1\nIDX 2\nATTR_no_blend 0.3\nTRIS 0 3\n'
+        'ATTR_shadow_blend 0.6\nTRIS 0 3\nATTR_blend\nATTR_shiny_rat 1\nTRIS 0 3\n'))
+    states = [dict(mesh['mat'][3]) for mesh in data['objects']]
+    # the blend modes replace each other, ATTR_blend clears both
+    assert states == [
+        {'blend': ('ATTR_no_blend', '0.3')},
+        {'shadow_blend': ('ATTR_shadow_blend', '0.6')},
+        {'shiny': ('ATTR_shiny_rat', '1')}]
+
+
+def test_absolute_texture_path(tmp_path):
+    # absolute paths are not looked up next to the obj, the search paths are still used
+    objDir = tmp_path / 'objects'
+    for directory in ('textures', 'search', 'objects/C:/textures', 'objects/textures'):
+        (tmp_path / directory).mkdir(parents=True)
+        (tmp_path / directory / 'panel.png').write_bytes(b'')
+    path = str(objDir / 'test.obj')
+    with open(path, 'w') as f:
+        f.write(HEADER + 'TEXTURE %s\nTEXTURE_LIT C:\\textures\\panel.png\n' % (tmp_path / 'textures' / 'panel.png')
+            + VERTS + 'IDX 0\nIDX 1\nIDX 2\nTRIS 0 3\n')
+    mesh, = xplane11parser.parseObj(path, texturePaths=[str(tmp_path / 'search')])['objects']
+    assert mesh['mat'][0] == str(tmp_path / 'textures' / 'panel.png')
+    if(os.name != 'nt'):
+        # not objects/C:/textures, there is no drive letter here
+        assert mesh['mat'][2] == str(tmp_path / 'search' / 'panel.png')
+
+
+def test_attribute_state(tmp_path):
+    data = xplane11parser.parseObj(writeObj(tmp_path, 'IDX 0\nIDX 1\nIDX 2\n'
+        'TRIS 0 3\nATTR_hard concrete\nATTR_no_cull\nTRIS 0 3\nTRIS 0 3\nATTR_hard_deck asphalt\nATTR_cull\nTRIS 0 3\n'
+        'ATTR_no_hard\nATTR_LOD 0 1000\nTRIS 0 3\n'))
+    # the lines written before each mesh are only attached to it, the state stays for the following meshes
+    assert [obj['attr'] for obj in data['objects']] == [[], [['ATTR_hard', 'concrete'], ['ATTR_no_cull']], [],
+        [['ATTR_hard_deck', 'asphalt'], ['ATTR_cull']], [['ATTR_no_hard'], ['ATTR_LOD', '0', '1000']]]
+    assert [obj['state'] for obj in data['objects']] == [[], [['ATTR_hard', 'concrete'], ['ATTR_no_cull']],
+        [['ATTR_hard', 'concrete'], ['ATTR_no_cull']], [['ATTR_hard_deck', 'asphalt']], []]
+
+
+def test_texture_directory_ignores_case(tmp_path):
+    # the obj asks for sub/panel.png, the files on disk are Sub/Panel.PNG and ../Shared/lit.dds
+    objDir = tmp_path / 'objects'
+    (objDir / 'Sub').mkdir(parents=True)
+    (tmp_path / 'Shared').mkdir()
+    (objDir / 'Sub' / 'Panel.PNG').write_bytes(b'')
+    (tmp_path / 'Shared' / 'lit.dds').write_bytes(b'')
+    path = str(objDir / 'test.obj')
+    with open(path, 'w') as f:
+        f.write(HEADER + 'TEXTURE sub/panel.png\nTEXTURE_LIT ..\\shared\\LIT.png\n' + VERTS + 'IDX 0\nIDX 1\nIDX 2\nTRIS 0 3\n')
+    mesh, = xplane11parser.parseObj(path)['objects']
+    assert mesh['mat'][0] == str(objDir / 'Sub' / 'Panel.PNG')
+    assert mesh['mat'][2] == str(tmp_path / 'Shared' / 'lit.dds')
@@ -0,0 +1,64 @@
+import os
+import time
+
+import pytest
+
+from conftest import readGolden, writeGolden, writeLargeObj
+
+import xplane11parser
+
+# fail when the throughput drops more than this fraction below the recorded baseline
+THRESHOLD = float(os.environ.get('XPLANE_PERF_THRESHOLD', '0.25'))
+
+pytestmark = pytest.mark.perf
+
+
+@pytest.fixture(scope='module')
+def largeObj(tmp_path_factory):
+    path = os.path.join(str(tmp_path_factory.mktemp('large')), 'large.obj')
+    numVerts = writeLargeObj(path, 500, 100)
+    return path, numVerts
+
+
+def bestTime(function, runs):
+    # the fastest of a few runs is the least affected by other load on the machine
+    best = None
+    for run in range(runs):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def checkThroughput(section, vertsPerSecond):
+    # the baseline in golden/perf.json depends on the machine, record it again with XPLANE_UPDATE_GOLDEN=1
+    if(os.environ.get('XPLANE_UPDATE_GOLDEN')):
+        writeGolden('perf', section, {'verts_per_second': round(vertsPerSecond)})
+    recorded = readGolden('perf')
+    if(section not in recorded):
+        pytest.fail('there is no %s throughput baseline, record it with XPLANE_UPDATE_GOLDEN=1' % section)
+
+    expected = recorded[section]['verts_per_second']
+    assert vertsPerSecond >= expected * (1 - THRESHOLD), \
+        '%s throughput %.0f verts/s is more than %d%% below the baseline of %.0f' % (section, vertsPerSecond, THRESHOLD * 100, expected)
+
+
+def test_large_file_is_valid(largeObj):
+    path, numVerts = largeObj
+    errors, warnings, stats = xplane11parser.validateObj(path)
+    assert errors == []
+    assert stats['VT'] == numVerts
+
+
+def test_parse_throughput(largeObj):
+    path, numVerts = largeObj
+    # the import parses with the vertex pool, the check without it
+    elapsed = bestTime(lambda: xplane11parser.parseObj(path), 3)
+    checkThroughput('parse', numVerts / elapsed)
+
+
+def test_build_throughput(importObj, largeObj):
+    path, numVerts = largeObj
+    elapsed = bestTime(lambda: importObj(path), 3)
+    checkThroughput('build', numVerts / elapsed)
@@ -0,0 +1,87 @@
+import os
+import tracemalloc
+
+import pytest
+
+from conftest import CORPUS, corpusPath, writeLargeObj
+
+import xplane11parser
+
+
+@pytest.fixture(scope='module')
+def largeObj(tmp_path_factory):
+    path = os.path.join(str(tmp_path_factory.mktemp('stream')), 'large.obj')
+    writeLargeObj(path, 200, 100)
+    return path
+
+
+def meshVertices(pool, mesh):
+    # the vertex values of every index in the TRIS range, the same whichever pool read them
+    vt, idx, first = pool.meshRange(*mesh['tris'])
+    return [tuple(vt[(index - first) * 8:(index - first + 1) * 8]) for index in idx]
+
+
+def meshSummary(mesh):
+    return (mesh['label'], mesh['tris'], mesh['orig'], mesh['offset'], mesh['kf'])
+
+
+def streamBlocks(path, keep=True):
+    # parse with the file pool and read every mesh in the order the blocks are passed on
+    # without keep the data is dropped straight away like the build does
+    meshes = []
+
+    def onBlock(objects, armatures, pool):
+        for mesh in objects + [mesh for arm in armatures for mesh in arm['meshes']]:
+            if(keep):
+                meshes.append((meshSummary(mesh), meshVertices(pool, mesh)))
+            else:
+                pool.meshRange(*mesh['tris'])
+
+    with xplane11parser.FilePool(path) as pool:
+        data = xplane11parser.parseObj(path, pool=pool, onBlock=onBlock)
+    return data, meshes
+
+
+@pytest.mark.parametrize('name', CORPUS)
+def test_stream_reads_the_same_meshes(name):
+    data = xplane11parser.parseObj(corpusPath(name))
+    expected = [(meshSummary(mesh), meshVertices(data['pool'], mesh))
+        for mesh in data['objects'] + [mesh for arm in data['armatures'] for mesh in arm['meshes']]]
+    streamed, meshes = streamBlocks(corpusPath(name))
+    assert streamed['errors'] == []
+    assert sorted(meshes) == sorted(expected)
+
+
+def test_stream_large_file(largeObj):
+    data = xplane11parser.parseObj(largeObj)
+    streamed, meshes = streamBlocks(largeObj)
+    assert len(meshes) == len(data['objects']) + sum(len(arm['meshes']) for arm in data['armatures'])
+    # the meshes are read back across many checkpoints
+    vertices = {summary[:2]: meshVertices for summary, meshVertices in meshes}
+    for mesh in data['objects']:
+        assert vertices[(mesh['label'], mesh['tris'])] == meshVertices(data['pool'], mesh)
+
+
+def test_point_counts_preallocates(largeObj):
+    pool = xplane11parser.parseObj(largeObj)['pool']
+    assert len(pool.vt) == pool.numVerts * 8
+    assert len(pool.idx) == pool.numIdx
+
+
+def peakMemory(function):
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def test_stream_memory_is_bounded(tmp_path):
+    # the default parse holds all the geometry, the stream only the offsets and one mesh at a time
+    path = os.path.join(str(tmp_path), 'memory.obj')
+    numVerts = writeLargeObj(path, 50, 100)
+    full = peakMemory(lambda: xplane11parser.parseObj(path))
+    stream = peakMemory(lambda: streamBlocks(path, keep=False))
+    assert full > numVerts * 8 * 4
+    assert stream < full / 10, 'stream peak %d bytes, default peak %d bytes' % (stream, full)
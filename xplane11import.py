@@ -50,6 +50,22 @@ import mathutils
 from mathutils import Vector, Euler
 import itertools
 import os
+import sys
+import time
+import json
+import argparse
+import tempfile
+import subprocess
+import hashlib
+import numpy as np
+
+# the parser does not need Blender, it is kept in its own module so files can be checked without it
+if(__package__):
+    from .xplane11parser import parseObj, validateObj, checkFiles, FilePool
+else:
+    # loaded as a single file add-on or run as a script, the parser is next to this file
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from xplane11parser import parseObj, validateObj, checkFiles, FilePool
 
 bl_info = {
     "name": "Import X-Plane OBJ",
@@ -62,18 +78,59 @@ bl_info = {
     "category": "Import-Export"
 }
 
+# counts from the last import, used by the command line conversion
+importStats = {'objects': 0, 'verts': 0}
+
 class xplane11import(bpy.types.Operator):
     bl_label = "Import X-Plane OBJ"
     bl_idname = "object.xplane11import"
 
     filepath: bpy.props.StringProperty(subtype="FILE_PATH")
+    stream_build: bpy.props.BoolProperty(
+        name="Memory-bounded build",
+        description="Read the geometry of each mesh back from the file as it is built instead of keeping the whole file in memory, for very large files. Meshes to merge are still kept until the whole file is read",
+        default=False)
+    merge_static: bpy.props.BoolProperty(
+        name="Merge static meshes",
+        description="Join all the meshes without animation that share a material, attributes and LOD level into one object",
+        default=False)
+    lod: bpy.props.IntProperty(
+        name="LOD",
+        description="Only import the geometry of this ATTR_LOD level, -1 imports all levels",
+        default=-1, min=-1)
+    skip_textures: bpy.props.BoolProperty(
+        name="Skip textures",
+        description="Do not load textures, materials are only created for the ATTR_ render state",
+        default=False)
+    texture_paths: bpy.props.StringProperty(
+        name="Texture paths",
+        description="More directories to search for textures, separated by '%s'" % os.pathsep,
+        default="")
 
 
     def execute(self, context):
         global collection
+        global importStats
         print("execute %s" % self.filepath)
+        if(self.stream_build):
+            # the meshes are built while the file is read, a broken file has to be found first
+            data = None
+            errors, warnings, stats = validateObj(self.filepath)
+        else:
+            # the whole file is parsed and checked before any Blender data is created
+            data = parseObj(self.filepath, **self.getParseOptions())
+            errors, warnings = data['errors'], data['warnings']
+        for warning in warnings:
+            print(warning)
+            self.report({'WARNING'}, '%s: %s' % (os.path.basename(self.filepath), warning))
+        if(errors):
+            for error in errors:
+                print(error)
+            self.report({'ERROR'}, '%s: %s' % (os.path.basename(self.filepath), errors[0]))
+            return {'CANCELLED'}
+
         # create new collection to match filename
-        collName = self.filepath.split('\\')[-1].split('.')[0]
+        collName = os.path.splitext(os.path.basename(self.filepath))[0]
         collection = bpy.data.collections.new(collName)
         bpy.context.scene.collection.children.link(collection)
         # any time the xplane class is used, that code requires having the Xplane2Blender plugin enabled
@@ -86,7 +143,8 @@ class xplane11import(bpy.types.Operator):
             print
 
         # do the import      
-        numObj = self.run((0,0,0))
+        numObj, numVerts = self.run(data)
+        importStats = {'objects': numObj, 'verts': numVerts}
         print('Imported %d objects' % numObj)
         return {"FINISHED"}
     
@@ -192,7 +250,11 @@ class xplane11import(bpy.types.Operator):
 
                 if(kf[0] == 'loop'):
                     # not really a keyframe, this just sets the loop value
-                    ob.xplane.datarefs[dataref_index].loop = kf[1]
+                    try:
+                        ob.xplane.datarefs[dataref_index].loop = kf[1]
+                    except Exception as e:
+                        print(self.getMessage('dataref'))
+                        print(e)
 
                 # end kf loop
 
@@ -225,10 +287,11 @@ class xplane11import(bpy.types.Operator):
         return ob
     
     def createMesh(self, name, origin, verts, faces, mat, uvs, normals, attr):
+        # verts, uvs and normals are the compacted numpy arrays for this mesh only
+        # faces is an (n, 3) array of indices into those arrays
         # Create mesh and object
         me = bpy.data.meshes.new(name+'Mesh')
         ob = bpy.data.objects.new(name, me)
-        #ob.location = Vector((0,0,0))
         ob.location = origin
         ob.show_name = False
         
@@ -237,32 +300,38 @@ class xplane11import(bpy.types.Operator):
         ob.select_set(True)
         bpy.context.view_layer.objects.active = ob
 
+        # Create mesh from given verts, faces in bulk
+        # count what is actually built, with --lod part of the file is skipped
+        self.numVerts += len(verts)
+        numFaces = len(faces)
+        numLoops = numFaces * 3
+        me.vertices.add(len(verts))
+        me.vertices.foreach_set('co', verts.ravel())
+        me.loops.add(numLoops)
+        me.loops.foreach_set('vertex_index', faces.ravel())
+        me.polygons.add(numFaces)
+        me.polygons.foreach_set('loop_start', np.arange(0, numLoops, 3, dtype=np.int32))
+        if(not bpy.types.MeshPolygon.bl_rna.properties['loop_total'].is_readonly):
+            # Blender 4.0 and later work the loop count out from the loop starts
+            me.polygons.foreach_set('loop_total', np.full(numFaces, 3, dtype=np.int32))
         # Apply shade smooth
-        bpy.ops.object.shade_smooth()    
-
-        # Create mesh from given verts, faces.
-        me.from_pydata(verts, [], faces)
+        me.polygons.foreach_set('use_smooth', np.ones(numFaces, dtype=bool))
+        me.update(calc_edges=True)
 
         # Assign the normals for each vertex
-        vindex = 0
-        newNormals = []
-        for vertex in me.vertices:
-            newNormals.append(normals[vindex])
-            vindex += 1
-
-        me.normals_split_custom_set_from_vertices(newNormals)
+        me.normals_split_custom_set_from_vertices(normals)
         # Update mesh with new data
-        me.calc_normals_split()
-        me.update(calc_edges=True)
+        if(hasattr(me, 'calc_normals_split')):
+            # removed in Blender 4.1, the split normals are always up to date there
+            me.calc_normals_split()
+        me.update()
 
         # Create uv layer
         uvlayer = me.uv_layers.new()
         me.uv_layers.active = uvlayer
 
-        # Assign the UV coordinates to each vertex
-        for face in me.polygons:
-            for vert_idx, loop_idx in zip(face.vertices, face.loop_indices):
-                uvlayer.data[loop_idx].uv = uvs[vert_idx]
+        # Assign the UV coordinates to each loop, loops follow the face vertex order
+        uvlayer.data.foreach_set('uv', uvs[faces.ravel()].ravel())
 
         if mat:
             # Assign material to object
@@ -278,34 +347,26 @@ class xplane11import(bpy.types.Operator):
             except Exception as e:
                 print(e)
 
-        # cleanup loose vertexes that don't belong in this object
-        try:
-            bpy.ops.object.mode_set(mode='EDIT')
-            bpy.ops.mesh.select_all(action='DESELECT')
-            bpy.ops.mesh.select_mode(type='VERT')
-            bpy.ops.mesh.select_loose()
-            bpy.ops.mesh.delete(type='VERT')
-            bpy.ops.object.mode_set(mode='OBJECT')
-        except Exception as e:
-            print(e)
-
         return ob
 
-    def loadImageTexture(self, filename):
+    def getTexturePaths(self):
+        return [path for path in self.texture_paths.split(os.pathsep) if path]
+
+    def getParseOptions(self):
+        return {'lod': self.lod, 'skipTextures': self.skip_textures, 'texturePaths': self.getTexturePaths()}
+
+    def loadImageTexture(self, imagePath):
+        # the parser already found the file, imagePath is the full path
         # Create texture
         try:
             tex = bpy.data.textures.new('Texture', type = 'IMAGE')
-            tex.image = bpy.data.images.load("%s\\%s" % (os.path.dirname(self.filepath), filename))
+            # reuse the image if another file already loaded it
+            tex.image = bpy.data.images.load(imagePath, check_existing=True)
             return tex
-        except:
-            # Try to load the image as .dds
-            try:
-                base = os.path.splitext(filename)[0]
-                tex.image = bpy.data.images.load("%s\\%s" % (os.path.dirname(self.filepath), base + '.dds'))
-                return tex
-            except:
-                print('Cannot find image file: ' + filename)
-                return False
+        except Exception as e:
+            print('Cannot load image file: ' + imagePath)
+            print(e)
+            return False
 
     def createBlenderMaterial(self, diffuseTex, name):
         # Create and add a material
@@ -359,46 +420,120 @@ class xplane11import(bpy.types.Operator):
 
         return material        
 
-    def getOrigins(self, keyframes):
-        # if the animation contains rotation, the rotation origin may be different
-        origin = Vector((0,0,0))
-        tempOrigin = 0
-        rotOrigin = Vector((0,0,0))
-        hasRotOrigin = False
-        for kf in keyframes:
-            if(len(kf)):
-                if(kf[0] == 'loc'):
-                    # save the translation position preceding rot
-                    tempOrigin = kf[1]
-                    # accumulate all translations for the obj location origin
-                    origin += kf[1]
-                if(kf[0] == 'rot' and hasRotOrigin == False):
-                    # if rotation follows translation, save we'll use that as the rotation origin
-                    if(tempOrigin == 0):
-                        # No previous ATTR loc present, assume only a rotation origin is present
-                        rotOrigin = Vector(kf[1])
-                    else:
-                        rotOrigin = tempOrigin
-                    hasRotOrigin = True
+    def applyRenderState(self, material, state):
+        # set the material up to match the ATTR_ render state
+        if('shiny' in state):
+            try:
+                bsdf = material.node_tree.nodes["Principled BSDF"]
+                # the input was renamed in Blender 4.0
+                specular = bsdf.inputs.get('Specular') or bsdf.inputs['Specular IOR Level']
+                specular.default_value = float(state['shiny'][1])
+            except Exception as e:
+                print(e)
 
-        return [origin, rotOrigin]
+        if('blend' in state or 'shadow_blend' in state):
+            # ATTR_no_blend cuts the texture alpha off at a threshold
+            # ATTR_shadow_blend only does that for the shadow, the surface still blends
+            blend = state.get('blend') or state['shadow_blend']
+            threshold = float(blend[1]) if len(blend) > 1 else 0.5
+            texImage = material.node_tree.nodes.get('Image Texture')
+            alpha = texImage.outputs['Alpha'] if texImage else None
+            try:
+                if(hasattr(material, 'surface_render_method')):
+                    # Blender 4.2 and later have no alpha clip mode, the cut off is done with a node
+                    # and the shadows follow the alpha of the surface
+                    if('blend' in state):
+                        material.surface_render_method = 'DITHERED'
+                        if(alpha):
+                            clip = material.node_tree.nodes.new('ShaderNodeMath')
+                            clip.name = 'Alpha Clip'
+                            clip.location = -150, 150
+                            clip.operation = 'GREATER_THAN'
+                            clip.inputs[1].default_value = threshold
+                            material.node_tree.links.new(clip.inputs[0], alpha)
+                            alpha = clip.outputs['Value']
+                    else:
+                        material.surface_render_method = 'BLENDED'
+                        material.use_transparent_shadow = True
+                else:
+                    if('blend' in state):
+                        material.blend_method = 'CLIP'
+                    else:
+                        material.shadow_method = 'CLIP'
+                    material.alpha_threshold = threshold
+            except Exception as e:
+                print(e)
+            if(alpha):
+                bsdf = material.node_tree.nodes["Principled BSDF"]
+                material.node_tree.links.new(bsdf.inputs['Alpha'], alpha)
 
-    def getMeshMedian(self, obj):
-        obj.update_from_editmode()
-        me = obj.data
-        verts_sel = [v.co for v in me.vertices]
-        pivot = sum(verts_sel, Vector()) / len(verts_sel)
-        return pivot
+        if('draped' in state):
+            try:
+                material.xplane.draped = True
+            except:
+                print(self.getMessage('xplane'))
 
-    def transformMeshOrigin(self, ob, origin):
-        # used to move the mesh origin
-        ob.data.transform(mathutils.Matrix.Translation(-origin))
-        return
+        return material
 
-    def translateObject(self, ob, location):
-        # used to move the entire object position
-        ob.matrix_world.translation += location
-        return
+    def createStateMaterial(self, key, keyHash):
+        # key = (texture, normal texture, lit texture, render state items)
+        texture, normal, lit, state = key
+        state = dict(state)
+        tex = self.loadImageTexture(texture) if texture else False
+        if(not tex and not state):
+            return None
+
+        name = os.path.splitext(os.path.basename(texture))[0] if texture else 'Material'
+        if(state):
+            # tell apart materials with the same texture but different attributes
+            name = '%s_%s' % (name, keyHash[:6])
+
+        if(tex):
+            #tex.use_alpha = True
+            # TODO: create alpha if needed
+            material = self.createBlenderMaterial(tex, name)
+            if(normal):
+                nrmtex = self.loadImageTexture(normal)
+                if(nrmtex):
+                    self.createNormalMap(material, nrmtex)
+            if(lit):
+                littex = self.loadImageTexture(lit)
+                if(littex):
+                    self.createEmissionShader(material, littex)
+        else:
+            material = bpy.data.materials.new(name)
+            material.use_nodes = True
+
+        return self.applyRenderState(material, state)
+
+    def getMaterial(self, key):
+        # one material per unique texture and render state
+        # the hash is stored on the material so later imports in the session reuse it
+        texture, normal, lit, state = key
+        if(texture is None and not state):
+            return None
+        keyHash = hashlib.sha1(repr(key).encode()).hexdigest()[:16]
+        if(keyHash not in self.materials):
+            material = self.createStateMaterial(key, keyHash)
+            if(material):
+                material['xplane_state'] = keyHash
+            self.materials[keyHash] = material
+        return self.materials[keyHash]
+
+    def getMeshData(self, pool, tris, offset):
+        # gather only the vertices used by this TRIS range and remap the face indices
+        # the pool keeps the file order x y z nx ny nz u v, the axes are swapped to Blender's here
+        # the offset is subtracted from all the vertices in one pass
+        vt, idx, first = pool.meshRange(*tris)
+        vt = np.frombuffer(vt, dtype=np.float32).reshape(-1, 8)
+        used, localFaces = np.unique(np.frombuffer(idx, dtype=np.int32) - first, return_inverse=True)
+        data = vt[used]
+        flip = np.array((1, -1, 1), dtype=np.float32)
+        verts = data[:, (0, 2, 1)] * flip
+        if(offset is not None):
+            verts -= np.array(offset, dtype=np.float32)
+        # foreach_set wants the same int size as the Blender property
+        return verts, localFaces.astype(np.int32).reshape(-1, 3), data[:, 6:8], data[:, (3, 5, 4)] * flip
 
     def addChild(self, objParent, obj,):
         try:
@@ -412,323 +547,134 @@ class xplane11import(bpy.types.Operator):
         return ()
 
 
-    def createBlenderObject(self, obj):
-        # obj = {label', 'orig',  'verts', 'faces', 'mat', 'uv', 'nrm', 'attr'}
+    def createBlenderObject(self, obj, pool):
+        # obj = {'label', 'orig', 'offset', 'tris', 'mat', 'attr', 'state', 'kf', 'lod'}
+        verts, faces, uvs, normals = self.getMeshData(pool, obj['tris'], obj['offset'])
 
         # create the mesh
-        meshObj = self.createMesh(obj['label'], obj['orig'], obj['verts'], obj['faces'], obj['mat'], obj['uv'], obj['nrm'], obj['attr'])      
+        meshObj = self.createMesh(obj['label'], obj['orig'], verts, faces, self.getMaterial(obj['mat']), uvs, normals, obj['attr'])
 
         return meshObj
 
-    # parse obLabel from dataref
-    def parse_dataref(self, dataref, obLabel=''):
-        if(obLabel != ''):
-            return dataref.split('/')[-1]
-        return obLabel
-
-    # parse file
-    def run(self, origo):
-        f = open(self.filepath, 'r')
-        lines = f.readlines()
-        f.close()
-        
-        verts = []
-        faces = []
-        normals = []
-        uv = []
-        attributes = []
-        material = 0
-        animID = -1
-        armLabel = ''
-        parentLabels = []
-        animStack = []
-        keyframes = []
-        trans1 = Vector( ( 0, 0, 0 ) )
-        trans2 = Vector( ( 0, 0, 0 ) )
-        tempKeyframe = ()
-        obLabel = ''
-        objID = 0
-        objects = []
-        armatures = []
-        for lineStr in lines:
-            line = lineStr.split()
-            if (len(line) == 0):
-                continue
-
-
-            if(line[0] == 'TEXTURE'):
-                texfilename = line[1]
-                tex = self.loadImageTexture(texfilename)
-                if(tex):
-                    #tex.use_alpha = True
-                    # TODO: create alpha if needed
-                    name = texfilename.split('.')[0]
-                    material = self.createBlenderMaterial(tex, name)
-                    # set the layer/collection texture property
-                    # just in case this is needed
-                    # the exporter should be able to autodetect the texture from the material
-                    # 
-                    try:
-                        collection.xplane.layer.texture = texfilename
-                    except:
-                        print('Could not assign texture to layer props')
-                continue
-
-            if(line[0] == 'TEXTURE_NORMAL'):
-                if(material):
-                    texfilename = line[1]
-                    nrmtex = self.loadImageTexture(texfilename)
-                    if(nrmtex):
-                        self.createNormalMap(material, nrmtex)
-                        try:
-                            collection.xplane.layer.texture_normal = texfilename
-                        except:
-                            print('Could not assign normal texture to layer props')
-                    continue
-
-            if(line[0] == 'TEXTURE_LIT'):
-                if(material):
-                    texfilename = line[1]
-                    littex = self.loadImageTexture(texfilename)
-                    if(littex):
-                        self.createEmissionShader(material, littex)
-                        try:
-                            collection.xplane.layer.texture_lit = texfilename
-                        except:
-                            print('Could not assign lit texture to layer props')
-
-            if(line[0] == '#'):
-                # if you export with debug mode, labels will be added for each object
-                # we can then name the imported objects better
-                # save as debug label
-                newLabel = '_'.join(line[1:])
-                if(obLabel != newLabel):
-                    obLabel = newLabel
-
-                continue
-
-
-            if(line[0] == 'VT'):
-                # get verts from line
-                vx = float(line[1])
-                vy = (float(line[3]) * -1)
-                vz = float(line[2])
-                verts.append((vx, vy, vz))
-
-                #get normals from line
-                vnx = float(line[4])
-                vny = float(line[6]) * -1
-                vnz = float(line[5])
-                normals.append((vnx, vny, vnz))
-
-                #get UV coords from line
-                uvx = float(line[7])
-                uvy = float(line[8])
-                uv.append((uvx, uvy))
-
-                continue
-            
-            if(line[0] == 'IDX10' or line[0] == 'IDX'):
-                faces.extend(map(int, line[1:]))
-                continue
-
-            if(line[0].startswith('ATTR_')):
-                # found a custom attribute
-                attributes.append(line)
-
-            if(line[0] == 'ANIM_begin'):
-                if(len(animStack)):
-                    # a new nested block started
-                    # add all the current keyframes to this stack
-                    animStack[-1]['kf'] = keyframes
-
-                # create a new block with unique ID
-                animID +=1
-                # add a block to the stack
-                armLabel = obLabel if obLabel != '' else 'ARM%d' % animID
-                animStack.append({'label': armLabel, 'kf': [], 'meshes': []})
-                # and track keyframes for this block
-                keyframes = []
-                continue
-                
-            if(line[0] == 'ANIM_trans'):
-                trans_x = float(line[1])
-                trans_y = (float(line[3]) * -1)
-                trans_z = float(line[2])
-                trans_x2 = float(line[4])
-                trans_y2 = (float(line[6]) * -1)
-                trans_z2 = float(line[5])
-                trans1 = Vector( (trans_x, trans_y, trans_z) )
-                trans2 = Vector( (trans_x2, trans_y2, trans_z2) )              
-
-                
-                if(len(line) == 7):
-                    # position only translation
-                    dataref = 'none'
-                    keyframes.append( ('loc', trans1, 0, dataref) )                    
-
-                if(len(line) == 10):
-                    # has a dataref
-                    dataref = line[9]
-                    obLabel = self.parse_dataref(dataref,obLabel)
-                    param1 = float(line[7])
-                    param2 = float(line[8])
-                    # add two keyframes
-                    keyframes.append( ('loc', trans1, param1, dataref) )
-                    keyframes.append( ('loc', trans2, param2, dataref) )
-                continue
-
-            if(line[0] == 'ANIM_trans_begin'):
-                dataref = line[1]
-                obLabel = self.parse_dataref(dataref,obLabel)
-                # start a new keyframe tuple, we will read the position and value later
-                tempKeyframe = ('loc',0,0,dataref)
-                continue
-
-            if(line[0] == 'ANIM_trans_key'):
-                # ANIM_trans_key <value> <x> <y> <z>
-                vec = Vector( (float(line[2]), (float(line[4]) * -1), float(line[3])) )
-                tempKeyframe = ( tempKeyframe[0], vec, float(line[1]), tempKeyframe[3])
-                keyframes.append( tempKeyframe )
-                continue
-
-            if(line[0] == 'ANIM_rotate'):
-                # ANIM_rotate <x> <y> <z> <r1> <r2> <v1> <v2> [dataref]
-                # we'll always use XYZ Euler as the rotation mode as this seems to be the Blender default
-                if(len(line) == 9):
-                    # has a dataref
-                    dataref = line[8]
-                    obLabel = self.parse_dataref(dataref,obLabel)
-                    # axis gets mapped as XZY because that will be Blenders XYZ
-                    axis = (float(line[1]), (float(line[3]) * -1), float(line[2]))
-                    r1 = float(line[4])
-                    r2 = float(line[5])
-                    v1 = float(line[6])
-                    v2 = float(line[7])                        
-                    # add two keyframes
-                    keyframes.append( ('rot', axis, v1, r1, dataref) )
-                    keyframes.append( ('rot', axis, v2, r2, dataref) )                 
-                continue
-
-            if(line[0] == 'ANIM_rotate_begin'):
-                # ANIM_rotate_begin <x> <y> <z> <dataref>
-                axis = (float(line[1]), (float(line[3]) * -1), float(line[2]))
-                dataref = line[4]
-                obLabel = self.parse_dataref(dataref,obLabel)
-                # create temp keyframe with some of the params
-                tempKeyframe = ('rot',axis,0.0,0.0,dataref)
-                continue
-
-            if(line[0] == 'ANIM_rotate_key'):
-                # ANIM_rotate_key <value> <angle>
-                tempKeyframe = ( tempKeyframe[0], tempKeyframe[1], float(line[1]), float(line[2]), tempKeyframe[4])
-                keyframes.append( tempKeyframe )            
-                continue
-
-            if(line[0] == 'ANIM_keyframe_loop'):
-                # add dataref loop property
-                keyframes.append( ('loop', float(line[1])) )
-
-            if(line[0] == 'ANIM_hide'):
-                # ANIM_hide <v1> <v2> <dataref>
-                v1 = float(line[1])
-                v2 = float(line[2])
-                dataref = line[3]
-                obLabel = self.parse_dataref(dataref,obLabel)
-                keyframes.append( ('hide', v1, v2, dataref) )
-                continue
-
-            if(line[0] == 'ANIM_show'):
-                # ANIM_show <v1> <v2> <dataref>
-                v1 = float(line[1])
-                v2 = float(line[2])
-                dataref = line[3]
-                obLabel = self.parse_dataref(dataref,obLabel)
-                keyframes.append( ('show', v1, v2, dataref) )
-                continue              
-            
-            if(line[0] == 'TRIS'):
-                obj_origin = Vector( origo )
-                tris_offset, tris_count = int(line[1]), int(line[2])
-                face_lst = faces[tris_offset:tris_offset+tris_count]
-                faceData = tuple( zip(*[iter(face_lst)]*3) )
-
-                if(obLabel == ''):
-                    obLabel = 'OBJ%d' % objID
-
-                # make a dict of the mesh object
-                meshObject = {'id': objID, 'label': obLabel, 'orig': obj_origin, 'verts': verts, 'faces': faceData, 'mat': material, 'uv': uv, 'nrm': normals, 'attr': attributes, 'kf': keyframes}
-
-                if(len(animStack)):                   
-                    # this is in an anim block, so add it to the last block in the stack
-                    animStack[-1]['meshes'].append(meshObject)
-                else:
-                    # this is just a plain mesh, add it to the loose objects list
-                    objects.append(meshObject)
-
-                meshObject = {}
-
-                obLabel = ''
-                objID += 1
-                tempKeyframe= ()
-                attributes = []
-                continue
-
-
-            if(line[0] == 'ANIM_end'):
-                if(len(animStack)):
-                    # pop the last block and assign to an armature
-                    anim = animStack.pop()
-                    armKeyframes = anim['kf']
-                    parent = ''
-                    if(len(keyframes)):
-                        # add any remaining animations from parent anim blocks
-                        armKeyframes = armKeyframes + keyframes
-                        if(len(animStack)):
-                            # if there is previous anim on the stack, that is the parent
-                            parent = animStack[-1]['label']
-                            parentLabels.append(parent)
-
-                    if(parent != '' or anim['label'] in parentLabels):
-                        # requires an armature to handle nested animation
-                        armatures.append({'label': anim['label'], 'kf': armKeyframes, 'parent': parent, 'meshes': anim['meshes']})
-                    else:
-                        # append to objects since this does not have a parent or child
-                        objects = objects + anim['meshes']
+    def buildArmature(self, arm, pool):
+        # create the armature at the rotation origin
+        BlenderArm = self.createArmature( arm['label'], arm['rotOrig'])
+        # set the label to the actual name of the Blender object
+        # as there could already be an exisiting object with the desired label
+        arm['objName'] = BlenderArm.name
+
+        # apply the keyframes to the armature
+        self.createKeyframes(arm['kf'], BlenderArm)
+
+        # create meshes associated with this block
+        # they are already offset to match the armature origin
+        for mesh in arm['meshes']:
+            meshObj = self.createBlenderObject(mesh, pool)
+            # parent it to the armature
+            self.addChild(BlenderArm, meshObj) 
+
+        return BlenderArm
+
+    def buildObject(self, obj, pool):
+        # the mesh is created at its final location and origin
+        meshObj = self.createBlenderObject(obj, pool)
+        if(len(obj['kf'])):
+            # apply object animation keyframes
+            self.createKeyframes(obj['kf'], meshObj)
 
+        return meshObj
+
+    def addStaticPart(self, staticGroups, obj, pool):
+        # collect the arrays of a mesh without animation to be merged with the others of the same state
+        # the arrays are gathered now so the parsed block can be freed
+        # meshes of different LOD levels must stay apart or the merged mesh would show in every level
+        # the state holds every ATTR_ in effect, not only the ones written right before the mesh
+        key = (obj['mat'], tuple(tuple(attribute) for attribute in obj['state']), obj['lod'])
+        verts, faces, uvs, normals = self.getMeshData(pool, obj['tris'], obj['offset'])
+        staticGroups.setdefault(key, []).append((obj['label'], obj['orig'], verts, faces, uvs, normals))
+        return
+
+    def setPartLabels(self, ob, labels, partIndex):
+        # keep the original object names on the faces so the merged mesh can be split apart again
+        try:
+            for label in labels:
+                ob.face_maps.new(name=label)
+            faceMaps = ob.data.face_maps.new()
+            faceMaps.data.foreach_set('value', partIndex)
+        except AttributeError:
+            # face maps were removed in Blender 4.0, use a face attribute instead
+            attribute = ob.data.attributes.new('xplane_part', 'INT', 'FACE')
+            attribute.data.foreach_set('value', partIndex)
+        # labels never contain spaces, the parser splits on whitespace
+        ob['xplane_parts'] = ' '.join(labels)
+        return
 
-                # clear some vars
-                keyframes = []
-                trans1 = Vector( ( 0, 0, 0 ) )
-                trans2 = Vector( ( 0, 0, 0 ) )
-                continue
+    def buildMergedObject(self, key, parts, index):
+        # parts = [(label, orig, verts, faces, uvs, normals)]
+        # concatenate the arrays, the face indices are shifted past the vertices of the earlier parts
+        vertOffsets = np.cumsum([0] + [len(part[2]) for part in parts[:-1]]).astype(np.int32)
+        verts = np.concatenate([part[2] for part in parts])
+        faces = np.concatenate([part[3] + offset for part, offset in zip(parts, vertOffsets)])
+        uvs = np.concatenate([part[4] for part in parts])
+        normals = np.concatenate([part[5] for part in parts])
+        # the part each face came from
+        partIndex = np.repeat(np.arange(len(parts), dtype=np.int32), [len(part[3]) for part in parts])
+
+        # the merged object gets all the attributes in effect for its parts
+        materialKey, attr, lod = key
+        meshObj = self.createMesh('STATIC%d' % index, parts[0][1], verts, faces, self.getMaterial(materialKey), uvs, normals, attr)
+        self.setPartLabels(meshObj, [part[0] for part in parts], partIndex)
 
-            # loop end
+        return meshObj
 
-        # loop through the armatures and create them in Blender
-        # we will add keyframes to all the armatures
+    def buildOrMerge(self, obj, pool, staticGroups):
+        # returns the number of Blender objects created
+        if(self.merge_static and not len(obj['kf'])):
+            self.addStaticPart(staticGroups, obj, pool)
+            return 0
+        self.buildObject(obj, pool)
+        return 1
+
+    # parse obLabel from dataref
+    def buildBlock(self, objects, armatures, pool):
+        # create the Blender objects for parsed armatures and meshes
         for arm in armatures:
-            # need to move the armature to the correct location based on rotations
-            keyframes = arm['kf']
-            origins = self.getOrigins(keyframes)
-            location = origins[0]
-            rotOrigin = origins[1]
-            # create the armature 
-            BlenderArm = self.createArmature( arm['label'], rotOrigin)
-            # set the label to the actual name of the Blender object
-            # as there could already be an exisiting object with the desired label
-            arm['objName'] = BlenderArm.name
-
-            # apply the keyframes to the armature
-            self.createKeyframes(keyframes, BlenderArm)
-
-            # create meshes associated with this block
-            for mesh in arm['meshes']:
-                meshObj = self.createBlenderObject(mesh)
-                # translate the mesh to match the armature origin
-                self.transformMeshOrigin(meshObj, BlenderArm.location)
-                # parent it to the armature
-                self.addChild(BlenderArm, meshObj) 
+            self.buildArmature(arm, pool)
+        for obj in objects:
+            self.numObj += self.buildOrMerge(obj, pool, self.staticGroups)
+        return
+
+    def setLayerTextures(self, layerTextures):
+        # set the layer/collection texture property
+        # just in case this is needed
+        # the exporter should be able to autodetect the texture from the material
+        for cmd, texfilename in layerTextures:
+            try:
+                setattr(collection.xplane.layer, cmd.lower(), texfilename)
+            except:
+                print('Could not assign texture to layer props')
+        return
+
+    # build the parsed file
+    # without parsed data the file is read now and every block is built as soon as it is complete
+    def run(self, data=None):
+        # materials from earlier imports, keyed by their state hash
+        self.materials = {mat['xplane_state']: mat for mat in bpy.data.materials if 'xplane_state' in mat}
+        # meshes without animation to merge, keyed by material and attributes
+        self.staticGroups = {}
+        self.numObj = 0
+        self.numVerts = 0
+
+        if(data is None):
+            # the geometry is read back from the file for each block, only the largest one is held at a time
+            with FilePool(self.filepath) as pool:
+                data = parseObj(self.filepath, pool=pool, onBlock=self.buildBlock, **self.getParseOptions())
+        else:
+            # loop through the armatures and create them in Blender
+            # we will add keyframes to all the armatures
+            self.buildBlock([], data['armatures'], data['pool'])
+        armatures = data['armatures']
+        self.setLayerTextures(data['layerTextures'])
 
         # fix the parent property to match the actual names
         for arm in armatures:
@@ -744,17 +690,11 @@ class xplane11import(bpy.types.Operator):
 
 
         # loop through the loose meshes and create the Blender meshes
-        for index, obj in enumerate(objects):
-            meshObj = self.createBlenderObject(obj)
-            if(len(obj['kf'])):
-                origins = self.getOrigins(obj['kf'])
-                location = origins[0]
-                rotOrigin = origins[1]
-                if(location != rotOrigin):
-                    self.transformMeshOrigin(meshObj, rotOrigin)
-                self.translateObject(meshObj, rotOrigin)
-                # apply object animation keyframes
-                self.createKeyframes(obj['kf'], meshObj)
+        self.buildBlock(data['objects'], [], data['pool'])
+
+        # create one object for each group of merged meshes
+        for index, (key, parts) in enumerate(self.staticGroups.items()):
+            self.buildMergedObject(key, parts, index)
 
 
         # create the parent/child relationships
@@ -771,8 +711,131 @@ class xplane11import(bpy.types.Operator):
 
         # end loop
 
-        return len(objects) + len(armatures)
-        
+        return self.numObj + len(self.staticGroups) + len(armatures), self.numVerts
+
+def convertFiles(inputs, args):
+    # import each file and save the .blend files, returns the number of failures and vertices
+    failed = 0
+    numVerts = 0
+    if(args.combine):
+        bpy.ops.wm.read_homefile(use_empty=True)
+    for path in inputs:
+        start = time.time()
+        try:
+            if(not args.combine):
+                # start every file from an empty scene
+                bpy.ops.wm.read_homefile(use_empty=True)
+            result = bpy.ops.object.xplane11import(filepath=path, lod=args.lod, skip_textures=args.skip_textures, stream_build=args.stream,
+                merge_static=args.merge_static, texture_paths=os.pathsep.join(args.texture_path))
+            if('FINISHED' not in result):
+                raise RuntimeError('import cancelled')
+            if(not args.combine):
+                outDir = args.output_dir or os.path.dirname(os.path.abspath(path))
+                outFile = os.path.join(outDir, os.path.splitext(os.path.basename(path))[0] + '.blend')
+                bpy.ops.wm.save_as_mainfile(filepath=outFile)
+            numVerts += importStats['verts']
+            print('%s: %d objects, %d verts in %.2fs' % (path, importStats['objects'], importStats['verts'], time.time() - start))
+        except Exception as e:
+            failed += 1
+            print('%s: FAILED' % path)
+            print(e)
+
+    if(args.combine):
+        try:
+            bpy.ops.wm.save_as_mainfile(filepath=os.path.abspath(args.combine))
+        except Exception as e:
+            # nothing was written so every file counts as failed
+            failed = len(inputs)
+            print(e)
+
+    return failed, numVerts
+
+def convertParallel(args):
+    # bpy can only be used from one thread, so run the files in separate Blender processes
+    chunks = [args.inputs[i::args.workers] for i in range(args.workers)]
+    workers = []
+    for chunk in chunks:
+        if(not chunk):
+            continue
+        statsFile = tempfile.NamedTemporaryFile(suffix='.json', delete=False)
+        statsFile.close()
+        # the workers load the user preferences, the XPlane2Blender add-on has to be enabled for the datarefs and attributes
+        cmd = [bpy.app.binary_path, '--background', '--python', os.path.abspath(__file__), '--']
+        cmd += chunk + ['--lod', str(args.lod), '--stats-file', statsFile.name]
+        if(args.output_dir):
+            cmd += ['--output-dir', args.output_dir]
+        for path in args.texture_path:
+            cmd += ['--texture-path', path]
+        if(args.skip_textures):
+            cmd.append('--skip-textures')
+        if(args.stream):
+            cmd.append('--stream')
+        if(args.merge_static):
+            cmd.append('--merge-static')
+        workers.append((chunk, statsFile.name, subprocess.Popen(cmd)))
+
+    failed = 0
+    numVerts = 0
+    for chunk, statsName, proc in workers:
+        proc.wait()
+        try:
+            with open(statsName) as statsFile:
+                stats = json.load(statsFile)
+            failed += stats['failed']
+            numVerts += stats['verts']
+        except Exception:
+            # the worker died before writing its stats
+            failed += len(chunk)
+        os.remove(statsName)
+
+    return failed, numVerts
+
+def main(argv=None):
+    # command line entry point, arguments follow the -- separator on the Blender command line
+    # blender --background --python xplane11import.py -- file1.obj file2.obj --output-dir out
+    if(argv is None):
+        argv = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else []
+
+    parser = argparse.ArgumentParser(prog='xplane11import', description='Convert X-Plane OBJ files to .blend files')
+    parser.add_argument('inputs', nargs='+', help='X-Plane .obj files to import')
+    parser.add_argument('-o', '--output-dir', help='directory for one .blend per input, defaults to the directory of each input')
+    parser.add_argument('-c', '--combine', metavar='BLEND', help='import all the inputs into this single .blend file')
+    parser.add_argument('--lod', type=int, default=-1, help='only import this ATTR_LOD level, -1 imports all levels')
+    parser.add_argument('--skip-textures', action='store_true', help='do not load textures, only create materials for the render state')
+    parser.add_argument('--texture-path', action='append', default=[], help='another directory to search for textures, can be repeated')
+    parser.add_argument('--stream', action='store_true', help='use the memory-bounded build mode')
+    parser.add_argument('--merge-static', action='store_true', help='merge the meshes without animation that share a material')
+    parser.add_argument('-j', '--workers', type=int, default=1, help='number of Blender processes to convert with')
+    parser.add_argument('--check', action='store_true', help='only check the files for errors, nothing is imported')
+    parser.add_argument('--stats-file', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if(args.check):
+        return 1 if checkFiles(args.inputs) else 0
+
+    if(args.workers > 1 and args.combine):
+        parser.error('--combine can only be used with a single worker')
+
+    if(not xplane11import.is_registered):
+        register()
+
+    start = time.time()
+    if(args.workers > 1):
+        failed, numVerts = convertParallel(args)
+    else:
+        failed, numVerts = convertFiles(args.inputs, args)
+    elapsed = max(time.time() - start, 1e-6)
+
+    if(args.stats_file):
+        # report back to the parent process
+        with open(args.stats_file, 'w') as statsFile:
+            json.dump({'failed': failed, 'verts': numVerts}, statsFile)
+
+    numFiles = len(args.inputs)
+    print('Converted %d of %d files in %.2fs' % (numFiles - failed, numFiles, elapsed))
+    print('Throughput: %.2f files/s, %.0f verts/s' % ((numFiles - failed) / elapsed, numVerts / elapsed))
+    return 1 if failed else 0
+
 def menu_func(self, context):
     self.layout.operator(xplane11import.bl_idname, text="XPlane 11 Object (.obj)")
     
@@ -786,4 +849,7 @@ def unregister():
     
 if __name__ == "__main__":
     register()
+    if('--' in sys.argv):
+        # run as a script with arguments, convert the files and exit
+        sys.exit(main())
     #bpy.ops.object.xplane11import("INVOKE_DEFAULT")
\ No newline at end of file
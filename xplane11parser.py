@@ -0,0 +1,706 @@
+# Reads X-Plane OBJ8 files into plain Python data for the importer
+#
+# This module does not need Blender, so the same parser checks the files on the command line:
+# python xplane11parser.py file1.obj file2.obj
+#
+# parseObj returns the loose objects and armatures of the file, every mesh is a dict with its TRIS range,
+# material key, attributes, the ATTR_ state in effect, keyframes and the location and offset worked out from the keyframes.
+# Positions are already in Blender axes, X-Plane's y is up so y and z swap and z flips sign.
+
+import os
+import re
+import sys
+import time
+import argparse
+import bisect
+from array import array
+
+# image types X-Plane can load, in order of preference
+TEXTURE_EXTENSIONS = ('.png', '.dds')
+
+# C:/ at the start of a Windows path
+DRIVE_PATH = re.compile(r'^[A-Za-z]:/')
+
+# directory -> {lower case name without extension: {extension: path}}
+# each directory is only scanned once per session
+textureIndex = {}
+
+def getTextureIndex(directory):
+    directory = os.path.abspath(directory)
+    index = textureIndex.get(directory)
+    if(index is None):
+        index = {}
+        try:
+            for entry in os.scandir(directory):
+                name, ext = os.path.splitext(entry.name)
+                ext = ext.lower()
+                if(ext in TEXTURE_EXTENSIONS and entry.is_file()):
+                    index.setdefault(name.lower(), {})[ext] = entry.path
+        except OSError:
+            # missing or unreadable directory, nothing to find there
+            pass
+        textureIndex[directory] = index
+    return index
+
+def findDirectory(base, relative):
+    # follow a relative directory path, each part is matched ignoring case like the file names
+    # returns None if a part does not exist
+    directory = os.path.abspath(base)
+    for part in relative.split('/'):
+        if(part in ('', '.')):
+            continue
+        if(part == '..'):
+            directory = os.path.dirname(directory)
+            continue
+        path = os.path.join(directory, part)
+        if(not os.path.isdir(path)):
+            path = None
+            try:
+                for entry in os.scandir(directory):
+                    if(entry.name.lower() == part.lower() and entry.is_dir()):
+                        path = entry.path
+                        break
+            except OSError:
+                pass
+            if(path is None):
+                return None
+        directory = path
+    return directory
+
+def findTexture(filename, objDir, searchPaths=()):
+    # texture paths are relative to the obj file unless they are absolute and may use either separator
+    # the directory and name are matched ignoring case and the .png or .dds version is used if the exact file is missing
+    texDir, name = os.path.split(filename.replace('\\', '/'))
+    name, ext = os.path.splitext(name)
+    name = name.lower()
+    ext = ext.lower()
+    if(os.path.isabs(texDir) or DRIVE_PATH.match(texDir + '/')):
+        # used as it is, a path with a drive letter only exists on Windows
+        texDir = texDir if os.path.isabs(texDir) else None
+    else:
+        texDir = findDirectory(objDir, texDir)
+    for directory in ([texDir] if texDir else []) + list(searchPaths):
+        found = getTextureIndex(directory).get(name)
+        if(found):
+            for candidate in (ext,) + TEXTURE_EXTENSIONS:
+                if(candidate in found):
+                    return found[candidate]
+    return None
+
+# ATTR_ directives that change the material, mapped to the part of the render state they set and the parts they clear
+# the X-Plane defaults ATTR_blend and ATTR_no_draped only clear, the three blend modes replace each other
+RENDER_ATTRIBUTES = {
+    'ATTR_shiny_rat': ('shiny', ()),
+    'ATTR_blend': (None, ('blend', 'shadow_blend')),
+    'ATTR_no_blend': ('blend', ('shadow_blend',)),
+    'ATTR_shadow_blend': ('shadow_blend', ('blend',)),
+    'ATTR_draped': ('draped', ()),
+    'ATTR_no_draped': (None, ('draped',))
+}
+
+# the other ATTR_ directives stay in effect for the following meshes until they are changed
+# ATTR_no_<part> and ATTR_<part>_<mode> set the same part of the state as ATTR_<part>
+ATTRIBUTE_PARTS = ('hard', 'cockpit', 'manip', 'light_level', 'draw')
+# the directives that put parts back to the X-Plane default, ATTR_reset only puts back the lighting
+DEFAULT_ATTRIBUTES = {
+    'ATTR_reset': ('emission_rgb',),
+    'ATTR_cull': ('cull',), 'ATTR_depth': ('depth',), 'ATTR_shadow': ('shadow',),
+    'ATTR_no_hard': ('hard',), 'ATTR_no_cockpit': ('cockpit',), 'ATTR_no_solid_camera': ('solid_camera',),
+    'ATTR_manip_none': ('manip',), 'ATTR_light_level_reset': ('light_level',), 'ATTR_draw_enable': ('draw',)
+}
+
+def getAttributePart(cmd):
+    # the part of the ATTR_ state a directive sets
+    name = cmd[len('ATTR_'):]
+    if(name.startswith('no_')):
+        name = name[len('no_'):]
+    for part in ATTRIBUTE_PARTS:
+        if(name == part or name.startswith(part + '_')):
+            return part
+    return name
+
+# smallest number of values after the directive for the lines the importer reads
+DIRECTIVE_ARGS = {
+    'POINT_COUNTS': 4, 'VT': 8, 'TRIS': 2, 'TEXTURE': 1, 'TEXTURE_NORMAL': 1, 'TEXTURE_LIT': 1,
+    'ANIM_trans': 6, 'ANIM_trans_begin': 1, 'ANIM_trans_key': 4,
+    'ANIM_rotate': 8, 'ANIM_rotate_begin': 4, 'ANIM_rotate_key': 2,
+    'ANIM_keyframe_loop': 1, 'ANIM_hide': 3, 'ANIM_show': 3
+}
+
+# the only value counts the importer understands for these directives
+# ANIM_trans without v1 v2 and a dataref is a fixed offset
+DIRECTIVE_COUNTS = {
+    'ANIM_trans': (6, 9), 'ANIM_rotate': (8,)
+}
+
+class CheckPool:
+    # only checks and counts the VT and IDX lines, nothing is kept
+    def __init__(self):
+        self.numVerts = 0
+        self.numIdx = 0
+
+    def reserve(self, numVerts, numIdx):
+        return
+
+    def addVertex(self, values, lineOffset):
+        for value in values:
+            float(value)
+        self.numVerts += 1
+
+    def addIndices(self, values, lineOffset):
+        indices = array('i', map(int, values))
+        self.numIdx += len(indices)
+        return indices
+
+    def finish(self):
+        # all the VT and IDX lines come before the first TRIS in an OBJ8 file
+        return
+
+    def meshRange(self, offset, count):
+        raise RuntimeError('the vertex data was not kept')
+
+class VertexPool(CheckPool):
+    # the VT and IDX data of the whole file in flat arrays
+    # every vertex is 8 floats, x y z nx ny nz u v as written in the file
+    # the values are collected in short lists and copied into the arrays in blocks
+    BLOCK = 8192
+
+    def __init__(self):
+        CheckPool.__init__(self)
+        self.vt = array('f')
+        self.idx = array('i')
+        self.vtBuffer = []
+        self.idxBuffer = []
+        self.vtUsed = 0
+        self.idxUsed = 0
+
+    def reserve(self, numVerts, numIdx):
+        # POINT_COUNTS gives the sizes up front, the arrays are allocated once instead of growing
+        if(self.numVerts == 0 and self.numIdx == 0 and numVerts >= 0 and numIdx >= 0):
+            self.vt = array('f', bytes(4 * 8 * numVerts))
+            self.idx = array('i', bytes(4 * numIdx))
+        return
+
+    def addVertex(self, values, lineOffset):
+        self.vtBuffer += map(float, values)
+        self.numVerts += 1
+        if(len(self.vtBuffer) >= self.BLOCK):
+            self.flush()
+
+    def addIndices(self, values, lineOffset):
+        indices = [int(value) for value in values]
+        self.idxBuffer += indices
+        self.numIdx += len(indices)
+        if(len(self.idxBuffer) >= self.BLOCK):
+            self.flush()
+        return indices
+
+    def flush(self):
+        # past the reserved size the slice assignment grows the array
+        self.vt[self.vtUsed:self.vtUsed + len(self.vtBuffer)] = array('f', self.vtBuffer)
+        self.vtUsed += len(self.vtBuffer)
+        self.vtBuffer = []
+        self.idx[self.idxUsed:self.idxUsed + len(self.idxBuffer)] = array('i', self.idxBuffer)
+        self.idxUsed += len(self.idxBuffer)
+        self.idxBuffer = []
+
+    def finish(self):
+        self.flush()
+        # drop the unused space if POINT_COUNTS declared more than the file has
+        del self.vt[self.vtUsed:]
+        del self.idx[self.idxUsed:]
+
+    def meshRange(self, offset, count):
+        # returns the vertex data, the indices of one TRIS range and the number of the first vertex in the data
+        return memoryview(self.vt), memoryview(self.idx)[offset:offset + count], 0
+
+class FilePool(CheckPool):
+    # keeps only the byte offset of every CHECKPOINT-th VT and IDX line
+    # each TRIS range is read back from the file when it is built, so the memory used follows
+    # the largest mesh instead of the whole file
+    # the VT values are not converted while parsing, check the file with validateObj first
+    CHECKPOINT = 64
+
+    def __init__(self, filepath):
+        CheckPool.__init__(self)
+        self.file = open(filepath, 'rb')
+        self.vtOffsets = array('q')
+        self.idxOffsets = array('q')
+        # the number of the first index on each checkpoint IDX line
+        self.idxStarts = array('q')
+        self.idxLines = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.file.close()
+
+    def addVertex(self, values, lineOffset):
+        if(self.numVerts % self.CHECKPOINT == 0):
+            self.vtOffsets.append(lineOffset)
+        self.numVerts += 1
+
+    def addIndices(self, values, lineOffset):
+        if(self.idxLines % self.CHECKPOINT == 0):
+            self.idxOffsets.append(lineOffset)
+            self.idxStarts.append(self.numIdx)
+        self.idxLines += 1
+        return CheckPool.addIndices(self, values, lineOffset)
+
+    def readLines(self, offset, directives):
+        # the split lines from the byte offset on, only the given directives
+        self.file.seek(offset)
+        for lineBytes in self.file:
+            line = lineBytes.split()
+            if(len(line) and line[0] in directives):
+                yield line
+
+    def meshRange(self, offset, count):
+        # returns the vertices between the lowest and highest index of the range,
+        # the indices of the range and the number of the first vertex read
+        if(count <= 0):
+            return array('f'), array('i'), 0
+        end = offset + count
+        checkpoint = bisect.bisect_right(self.idxStarts, offset) - 1
+        position = self.idxStarts[checkpoint]
+        idx = array('i')
+        for line in self.readLines(self.idxOffsets[checkpoint], (b'IDX', b'IDX10')):
+            if(position >= end):
+                break
+            numValues = len(line) - 1
+            if(position + numValues > offset):
+                idx.extend(map(int, line[1 + max(offset - position, 0):1 + end - position]))
+            position += numValues
+
+        vt = array('f')
+        if(not len(idx)):
+            return vt, idx, 0
+        first = min(idx)
+        numVerts = max(idx) + 1 - first
+        checkpoint = first // self.CHECKPOINT
+        skip = first - checkpoint * self.CHECKPOINT
+        for line in self.readLines(self.vtOffsets[checkpoint], (b'VT',)):
+            if(skip):
+                skip -= 1
+                continue
+            if(numVerts == 0):
+                break
+            vt.extend(map(float, line[1:9]))
+            numVerts -= 1
+        return vt, idx, first
+
+# parse obLabel from dataref
+def parse_dataref(dataref, obLabel=''):
+    if(obLabel != ''):
+        return dataref.split('/')[-1]
+    return obLabel
+
+def addVectors(a, b):
+    return (a[0] + b[0], a[1] + b[1], a[2] + b[2])
+
+def getOrigins(keyframes):
+    # if the animation contains rotation, the rotation origin may be different
+    origin = (0.0, 0.0, 0.0)
+    tempOrigin = None
+    rotOrigin = (0.0, 0.0, 0.0)
+    hasRotOrigin = False
+    for kf in keyframes:
+        if(len(kf)):
+            if(kf[0] == 'loc'):
+                # save the translation position preceding rot
+                tempOrigin = kf[1]
+                # accumulate all translations for the obj location origin
+                origin = addVectors(origin, kf[1])
+            if(kf[0] == 'rot' and hasRotOrigin == False):
+                # if rotation follows translation, save we'll use that as the rotation origin
+                if(tempOrigin is None):
+                    # No previous ATTR loc present, assume only a rotation origin is present
+                    rotOrigin = kf[1]
+                else:
+                    rotOrigin = tempOrigin
+                hasRotOrigin = True
+
+    return [origin, rotOrigin]
+
+def setOrigins(objects, armatures):
+    # resolve the object locations and mesh offsets on the parsed data
+    # so the meshes can be created already centred on their pivot
+    # meshes from the same anim block share the keyframe list, only compute it once
+    cache = {}
+    for arm in armatures:
+        # the armature is located at the rotation origin
+        arm['rotOrig'] = getOrigins(arm['kf'])[1]
+        for mesh in arm['meshes']:
+            mesh['offset'] = arm['rotOrig']
+
+    for obj in objects:
+        if(len(obj['kf'])):
+            key = id(obj['kf'])
+            if(key not in cache):
+                cache[key] = getOrigins(obj['kf'])
+            location, rotOrigin = cache[key]
+            if(location != rotOrigin):
+                # move the mesh origin to the rotation origin
+                obj['offset'] = rotOrigin
+            # move the entire object to the rotation origin
+            obj['orig'] = addVectors(obj['orig'], rotOrigin)
+    return
+
+def parseObj(filepath, lod=-1, skipTextures=False, texturePaths=(), pool=None, onBlock=None):
+    # read the file once, check its structure and collect the objects to build
+    # lod selects one ATTR_LOD level, -1 keeps all of them
+    # with onBlock, each block is passed to onBlock(objects, armatures, pool) as soon as it is complete
+    # and only the armature names are kept for parenting
+    # returns a dict with the objects, armatures, vertex pool, textures for the layer, errors, warnings and directive counts
+    # errors stop the import, warnings are only reported
+    pool = pool if pool is not None else VertexPool()
+    objDir = os.path.dirname(filepath)
+    fileSize = os.path.getsize(filepath)
+    errors = []
+    warnings = []
+    stats = {}
+    # the I or A, version and OBJ lines at the top are not directives
+    headerLines = 3
+    attributes = []
+    # the ATTR_ state that is not part of the material, by the part each directive sets
+    attributeState = {}
+    # the current TEXTURE directives and ATTR_ render state, these make up the material
+    textures = {}
+    layerTextures = []
+    renderState = {}
+    animID = -1
+    parentLabels = []
+    animStack = []
+    keyframes = []
+    tempKeyframe = ()
+    # the ANIM_trans_begin or ANIM_rotate_begin table the keys belong to
+    keyTable = ''
+    obLabel = ''
+    objID = 0
+    objects = []
+    armatures = []
+    # ATTR_LOD level of the current geometry
+    lodLevel = -1
+    pointCounts = None
+    maxIdx = -1
+    maxIdxLine = 0
+    trisLine = 0
+    # byte offset of each line, a pool can use it to read the geometry back
+    lineOffset = 0
+
+    # read the file line by line so the whole text is never held in memory
+    with open(filepath, 'rb') as f:
+        for lineNum, lineBytes in enumerate(f, 1):
+            offset = lineOffset
+            lineOffset += len(lineBytes)
+            line = lineBytes.decode('utf-8', 'replace').split()
+            if(len(line) == 0):
+                continue
+
+            if(headerLines):
+                headerLines -= 1
+                continue
+
+            cmd = line[0]
+            if(cmd.startswith('#')):
+                if(cmd == '#'):
+                    # if you export with debug mode, labels will be added for each object
+                    # we can then name the imported objects better
+                    obLabel = '_'.join(line[1:])
+                continue
+
+            stats[cmd] = stats.get(cmd, 0) + 1
+            if(len(line) - 1 < DIRECTIVE_ARGS.get(cmd, 0)):
+                errors.append('line %d: %s expects %d values' % (lineNum, cmd, DIRECTIVE_ARGS[cmd]))
+                continue
+            if(cmd in DIRECTIVE_COUNTS and len(line) - 1 not in DIRECTIVE_COUNTS[cmd]):
+                errors.append('line %d: %s expects %s values' % (lineNum, cmd, ' or '.join(map(str, DIRECTIVE_COUNTS[cmd]))))
+                continue
+
+            try:
+                if(cmd == 'VT'):
+                    if(trisLine):
+                        errors.append('line %d: VT after the first TRIS on line %d' % (lineNum, trisLine))
+                        continue
+                    pool.addVertex(line[1:9], offset)
+
+                elif(cmd == 'IDX10' or cmd == 'IDX'):
+                    if(trisLine):
+                        errors.append('line %d: %s after the first TRIS on line %d' % (lineNum, cmd, trisLine))
+                        continue
+                    indices = pool.addIndices(line[1:], offset)
+                    if(len(indices)):
+                        if(min(indices) < 0):
+                            errors.append('line %d: negative vertex index' % lineNum)
+                        if(max(indices) > maxIdx):
+                            maxIdx = max(indices)
+                            maxIdxLine = lineNum
+
+                elif(cmd == 'TRIS'):
+                    if(not trisLine):
+                        trisLine = lineNum
+                        pool.finish()
+                    trisOffset, trisCount = int(line[1]), int(line[2])
+                    if(trisOffset < 0 or trisCount < 0 or trisOffset + trisCount > pool.numIdx):
+                        errors.append('line %d: TRIS %d %d is outside the %d indices' % (lineNum, trisOffset, trisCount, pool.numIdx))
+                    if(trisCount % 3):
+                        errors.append('line %d: TRIS count %d is not a multiple of 3' % (lineNum, trisCount))
+
+                    # geometry before the first ATTR_LOD belongs to the first level
+                    if(lod < 0 or max(lodLevel, 0) == lod):
+                        # the material is looked up from this key when the mesh is built
+                        materialKey = (textures.get('TEXTURE'), textures.get('TEXTURE_NORMAL'), textures.get('TEXTURE_LIT'), tuple(sorted(renderState.items())))
+                        if(obLabel == ''):
+                            obLabel = 'OBJ%d' % objID
+
+                        # make a dict of the mesh object
+                        # attr are the ATTR_ lines written right before this mesh, state all the ones in effect
+                        meshObject = {'id': objID, 'label': obLabel, 'orig': (0.0, 0.0, 0.0), 'offset': None,
+                            'tris': (trisOffset, trisCount), 'mat': materialKey, 'attr': attributes,
+                            'state': sorted(attributeState.values()), 'kf': keyframes, 'lod': max(lodLevel, 0)}
+
+                        if(len(animStack)):
+                            # this is in an anim block, so add it to the last block in the stack
+                            animStack[-1]['meshes'].append(meshObject)
+                        elif(onBlock):
+                            # nothing later can reference a top level mesh, pass it on now
+                            setOrigins([meshObject], [])
+                            onBlock([meshObject], [], pool)
+                        else:
+                            # this is just a plain mesh, add it to the loose objects list
+                            objects.append(meshObject)
+                        objID += 1
+
+                    # not the selected LOD skips the mesh, the label and attributes go with it
+                    obLabel = ''
+                    attributes = []
+
+                elif(cmd in ('TEXTURE', 'TEXTURE_NORMAL', 'TEXTURE_LIT') and not skipTextures):
+                    texfilename = line[1]
+                    texPath = findTexture(texfilename, objDir, texturePaths)
+                    if(texPath is None):
+                        print('Cannot find image file: ' + texfilename)
+                        continue
+                    # the image is loaded when the material is created
+                    textures[cmd] = texPath
+                    # the importer also sets the layer texture properties from these
+                    layerTextures.append((cmd, texfilename))
+
+                elif(cmd == 'POINT_COUNTS'):
+                    # POINT_COUNTS <vt> <vline> <vlight> <idx>
+                    pointCounts = (lineNum, int(line[1]), int(line[4]))
+                    # a wrong count can not allocate more than the file could hold
+                    pool.reserve(min(pointCounts[1], fileSize // 16), min(pointCounts[2], fileSize // 2))
+
+                elif(cmd.startswith('ATTR_')):
+                    if(cmd == 'ATTR_LOD'):
+                        # each ATTR_LOD starts the geometry of the next level
+                        lodLevel += 1
+                    if(cmd == 'ATTR_reset'):
+                        renderState = {}
+                    if(cmd in RENDER_ATTRIBUTES):
+                        # track the render state for the material of the following meshes
+                        stateKey, cleared = RENDER_ATTRIBUTES[cmd]
+                        for key in cleared:
+                            renderState.pop(key, None)
+                        if(stateKey):
+                            renderState[stateKey] = tuple(line)
+                    elif(cmd in DEFAULT_ATTRIBUTES):
+                        for part in DEFAULT_ATTRIBUTES[cmd]:
+                            attributeState.pop(part, None)
+                    elif(cmd != 'ATTR_LOD'):
+                        attributeState[getAttributePart(cmd)] = line
+                    # found a custom attribute
+                    attributes.append(line)
+
+                elif(cmd == 'ANIM_begin'):
+                    if(len(animStack)):
+                        # a new nested block started
+                        # add all the current keyframes to this stack
+                        animStack[-1]['kf'] = keyframes
+
+                    # create a new block with unique ID
+                    animID += 1
+                    # add a block to the stack
+                    armLabel = obLabel if obLabel != '' else 'ARM%d' % animID
+                    animStack.append({'label': armLabel, 'kf': [], 'meshes': []})
+                    # and track keyframes for this block
+                    keyframes = []
+
+                elif(cmd == 'ANIM_end'):
+                    if(keyTable):
+                        errors.append('line %d: ANIM_end inside an unclosed %s' % (lineNum, keyTable))
+                        keyTable = ''
+                    if(not len(animStack)):
+                        errors.append('line %d: ANIM_end without ANIM_begin' % lineNum)
+                        continue
+
+                    # pop the last block and assign to an armature
+                    anim = animStack.pop()
+                    armKeyframes = anim['kf']
+                    parent = ''
+                    if(len(keyframes)):
+                        # add any remaining animations from parent anim blocks
+                        armKeyframes = armKeyframes + keyframes
+                        if(len(animStack)):
+                            # if there is previous anim on the stack, that is the parent
+                            parent = animStack[-1]['label']
+                            parentLabels.append(parent)
+
+                    if(parent != '' or anim['label'] in parentLabels):
+                        # requires an armature to handle nested animation
+                        arm = {'label': anim['label'], 'kf': armKeyframes, 'parent': parent, 'meshes': anim['meshes']}
+                        if(onBlock):
+                            # the block is complete, pass it on and only keep the names for parenting
+                            setOrigins([], [arm])
+                            onBlock([], [arm], pool)
+                            arm['meshes'] = []
+                        armatures.append(arm)
+                    elif(onBlock):
+                        # the block is complete, pass the meshes on now
+                        setOrigins(anim['meshes'], [])
+                        onBlock(anim['meshes'], [], pool)
+                    else:
+                        # append to objects since this does not have a parent or child
+                        objects = objects + anim['meshes']
+
+                    # clear some vars
+                    keyframes = []
+
+                elif(cmd.startswith('ANIM_') and not len(animStack)):
+                    errors.append('line %d: %s outside an ANIM_begin block' % (lineNum, cmd))
+
+                elif(cmd == 'ANIM_trans'):
+                    # ANIM_trans <x1> <y1> <z1> <x2> <y2> <z2> [<v1> <v2> <dataref>]
+                    trans1 = (float(line[1]), float(line[3]) * -1, float(line[2]))
+                    trans2 = (float(line[4]), float(line[6]) * -1, float(line[5]))
+                    if(len(line) == 7):
+                        # position only translation
+                        keyframes.append( ('loc', trans1, 0, 'none') )
+                    else:
+                        # has a dataref
+                        dataref = line[9]
+                        obLabel = parse_dataref(dataref, obLabel)
+                        # add two keyframes
+                        keyframes.append( ('loc', trans1, float(line[7]), dataref) )
+                        keyframes.append( ('loc', trans2, float(line[8]), dataref) )
+
+                elif(cmd == 'ANIM_rotate'):
+                    # ANIM_rotate <x> <y> <z> <r1> <r2> <v1> <v2> <dataref>
+                    # we'll always use XYZ Euler as the rotation mode as this seems to be the Blender default
+                    dataref = line[8]
+                    obLabel = parse_dataref(dataref, obLabel)
+                    # axis gets mapped as XZY because that will be Blenders XYZ
+                    axis = (float(line[1]), float(line[3]) * -1, float(line[2]))
+                    r1, r2, v1, v2 = float(line[4]), float(line[5]), float(line[6]), float(line[7])
+                    # add two keyframes
+                    keyframes.append( ('rot', axis, v1, r1, dataref) )
+                    keyframes.append( ('rot', axis, v2, r2, dataref) )
+
+                elif(cmd == 'ANIM_trans_begin' or cmd == 'ANIM_rotate_begin'):
+                    if(keyTable):
+                        errors.append('line %d: %s inside an unclosed %s' % (lineNum, cmd, keyTable))
+                    keyTable = cmd
+                    if(cmd == 'ANIM_trans_begin'):
+                        # ANIM_trans_begin <dataref>
+                        dataref = line[1]
+                        # start a new keyframe tuple, we will read the position and value later
+                        tempKeyframe = ('loc', 0, 0, dataref)
+                    else:
+                        # ANIM_rotate_begin <x> <y> <z> <dataref>
+                        axis = (float(line[1]), float(line[3]) * -1, float(line[2]))
+                        dataref = line[4]
+                        # create temp keyframe with some of the params
+                        tempKeyframe = ('rot', axis, 0.0, 0.0, dataref)
+                    obLabel = parse_dataref(dataref, obLabel)
+
+                elif(cmd == 'ANIM_trans_key' or cmd == 'ANIM_rotate_key'):
+                    begin = cmd.replace('_key', '_begin')
+                    if(keyTable != begin):
+                        errors.append('line %d: %s without %s' % (lineNum, cmd, begin))
+                    elif(cmd == 'ANIM_trans_key'):
+                        # ANIM_trans_key <value> <x> <y> <z>
+                        vec = (float(line[2]), float(line[4]) * -1, float(line[3]))
+                        keyframes.append( (tempKeyframe[0], vec, float(line[1]), tempKeyframe[3]) )
+                    else:
+                        # ANIM_rotate_key <value> <angle>
+                        keyframes.append( (tempKeyframe[0], tempKeyframe[1], float(line[1]), float(line[2]), tempKeyframe[4]) )
+
+                elif(cmd == 'ANIM_trans_end' or cmd == 'ANIM_rotate_end'):
+                    begin = cmd.replace('_end', '_begin')
+                    if(keyTable != begin):
+                        errors.append('line %d: %s without %s' % (lineNum, cmd, begin))
+                    keyTable = ''
+
+                elif(cmd == 'ANIM_keyframe_loop'):
+                    # add dataref loop property
+                    keyframes.append( ('loop', float(line[1])) )
+
+                elif(cmd == 'ANIM_hide' or cmd == 'ANIM_show'):
+                    # ANIM_hide <v1> <v2> <dataref>
+                    dataref = line[3]
+                    obLabel = parse_dataref(dataref, obLabel)
+                    keyframes.append( (cmd[5:], float(line[1]), float(line[2]), dataref) )
+
+            except ValueError:
+                errors.append('line %d: bad number in %s' % (lineNum, cmd))
+
+    pool.finish()
+    if(maxIdx >= pool.numVerts):
+        errors.append('line %d: vertex index %d is outside the %d vertices' % (maxIdxLine, maxIdx, pool.numVerts))
+    if(len(animStack)):
+        errors.append('%d ANIM_begin without ANIM_end' % len(animStack))
+    if(pointCounts and (pointCounts[1] != pool.numVerts or pointCounts[2] != pool.numIdx)):
+        # the geometry is complete, X-Plane only uses the counts to allocate
+        warnings.append('line %d: POINT_COUNTS declares %d vertices and %d indices, found %d and %d'
+            % (pointCounts[0], pointCounts[1], pointCounts[2], pool.numVerts, pool.numIdx))
+
+    if(not onBlock):
+        # work out all the origins before any Blender data is created
+        setOrigins(objects, armatures)
+
+    return {'objects': objects, 'armatures': armatures, 'pool': pool, 'layerTextures': layerTextures,
+        'errors': errors, 'warnings': warnings, 'stats': stats}
+
+def validateObj(filepath):
+    # parse the file without keeping the geometry and check its structure
+    # returns the lists of error and warning strings and the number of times each directive is used
+    data = parseObj(filepath, skipTextures=True, pool=CheckPool())
+    return data['errors'], data['warnings'], data['stats']
+
+def checkFiles(inputs):
+    # validate the files only, returns the number of files with errors
+    failed = 0
+    totals = {}
+    start = time.time()
+    for path in inputs:
+        try:
+            errors, warnings, stats = validateObj(path)
+        except Exception as e:
+            errors, warnings, stats = [str(e)], [], {}
+        for cmd, count in stats.items():
+            totals[cmd] = totals.get(cmd, 0) + count
+        if(errors):
+            failed += 1
+            for error in errors:
+                print('%s: %s' % (path, error))
+        for warning in warnings:
+            print('%s: warning: %s' % (path, warning))
+    elapsed = max(time.time() - start, 1e-6)
+
+    for cmd in sorted(totals):
+        print('%-24s %d' % (cmd, totals[cmd]))
+    print('Checked %d files in %.2fs, %d with errors' % (len(inputs), elapsed, failed))
+    print('Throughput: %.2f files/s, %.0f verts/s' % (len(inputs) / elapsed, totals.get('VT', 0) / elapsed))
+    return failed
+
+def main(argv=None):
+    # check files without Blender, the exit code is non-zero if any file has errors
+    parser = argparse.ArgumentParser(prog='xplane11parser', description='Check X-Plane OBJ files for structural errors')
+    parser.add_argument('inputs', nargs='+', help='X-Plane .obj files to check')
+    args = parser.parse_args(argv)
+    return 1 if checkFiles(args.inputs) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())